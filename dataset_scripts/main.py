@@ -2,8 +2,22 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import warnings
+from collections import Counter
+from dataclasses import asdict, dataclass, field
 warnings.filterwarnings('ignore')
 
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    # pyarrow is optional; the raw CSV is then read with pandas
+    pa = None
+
+# Let derived frames share data with their source until they are modified.
+# pandas 3 always works this way and deprecates the option, so only set it before that
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
 # Data source: https://www.kaggle.com/datasets/ahmedmohamed2003/cafe-sales-dirty-data-for-cleaning-training?resource=download
 
 # Menu prices reference
@@ -18,109 +32,263 @@ MENU_PRICES = {
     'Juice': 3.0
 }
 
-def load_data():
-    """Load the dirty cafe sales data"""
-    print("Loading data...")
-    df = pd.read_csv('dirty_cafe_sales.csv')
-    print(f"Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
-    return df
+# Reverse lookup used to infer a missing item from its price. Several items
+# share a price, so the first item listed in MENU_PRICES wins the tie.
+PRICE_TO_ITEM = {price: item for item, price in reversed(MENU_PRICES.items())}
+
+# Menu prices as a Series, in the Float32 dtype the cleaned prices use
+MENU_PRICE_SERIES = pd.Series(MENU_PRICES, dtype='float32', name='Price Per Unit')
+
+# Placeholder values used in the raw data for missing entries
+PROBLEMATIC_VALUES = ['', 'ERROR', 'UNKNOWN']
+
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = ['Item', 'Payment Method', 'Location']
+
+# Column dtypes for the raw CSV. Numeric and date columns are read as text
+# because they still hold the placeholder values reported on by the EDA;
+# they are converted during cleaning.
+RAW_DTYPES = {
+    'Transaction ID': str,
+    'Item': 'category',
+    'Quantity': str,
+    'Price Per Unit': str,
+    'Total Spent': str,
+    'Payment Method': 'category',
+    'Location': 'category',
+    'Transaction Date': str
+}
+
+# Rows read from the raw CSV at a time; bounds peak memory for large exports
+CHUNK_SIZE = 100_000
+
+# Print per-item breakdowns of imputed and corrected values, not just totals
+VERBOSE = False
+
+# Fallback values for filling missing categorical data when no valid value exists
+FILL_DEFAULTS = {
+    'Payment Method': 'Cash',
+    'Location': 'In-store'
+}
+
+def calc_error_mask(quantity, price, total):
+    """Flag rows where total does not equal quantity * price, given numeric Series"""
+    quantity = quantity.to_numpy(dtype='float64', na_value=np.nan)
+    price = price.to_numpy(dtype='float64', na_value=np.nan)
+    total_values = total.to_numpy(dtype='float64', na_value=np.nan)
+    errors = ~np.isclose(total_values, quantity * price, rtol=1e-09, equal_nan=True)
+    return pd.Series(errors, index=total.index)
+
+def find_calc_errors(df):
+    """Flag rows where Total Spent does not equal Quantity * Price Per Unit"""
+    # Convert numeric columns, handling errors
+    return calc_error_mask(
+        pd.to_numeric(df['Quantity'], errors='coerce'),
+        pd.to_numeric(df['Price Per Unit'], errors='coerce'),
+        pd.to_numeric(df['Total Spent'], errors='coerce'),
+    )
+
+def lookup_menu_prices(items):
+    """Return the menu price of every entry of the categorical Item series"""
+    # One price per category plus a trailing NaN that missing items (code -1) pick up
+    menu_array = np.append(MENU_PRICE_SERIES.reindex(items.cat.categories).to_numpy(), np.float32(np.nan))
+    return pd.Series(menu_array[items.cat.codes.to_numpy()], index=items.index)
+
+def count_placeholders(df):
+    """Locate placeholder values in df and count them per value and column"""
+    # Find all placeholder cells in one pass, then break them down per value
+    problematic_mask = df.isin(PROBLEMATIC_VALUES)
+    placeholder_counts = pd.DataFrame({
+        col: df.loc[problematic_mask[col], col].value_counts() for col in df.columns
+    }).reindex(PROBLEMATIC_VALUES).fillna(0).astype(int)
+    return problematic_mask, placeholder_counts
+
+def most_common_value(counts, default):
+    """Return the most frequent valid value, breaking ties like Series.mode()"""
+    valid = {value: count for value, count in counts.items() if value not in PROBLEMATIC_VALUES and count > 0}
+    if not valid:
+        return default
+    return min(valid, key=lambda value: (-valid[value], value))
+
+def read_csv_arrow(filename, chunksize):
+    """Stream filename as DataFrame chunks using pyarrow's multithreaded CSV reader"""
+    # Categorical columns are dictionary-encoded while parsing, so they arrive as pandas categoricals
+    column_types = {
+        col: pa.dictionary(pa.int32(), pa.string()) if dtype == 'category' else pa.string()
+        for col, dtype in RAW_DTYPES.items()
+    }
+    reader = pacsv.open_csv(
+        filename,
+        # Blocks are sized in bytes; raw rows are a little over 50 bytes each
+        read_options=pacsv.ReadOptions(block_size=chunksize * 64),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=list(RAW_DTYPES), column_types=column_types, strings_can_be_null=True
+        ),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+def load_data(chunksize=CHUNK_SIZE):
+    """Open the dirty cafe sales data as an iterator of DataFrame chunks"""
+    if pa is not None:
+        return read_csv_arrow('dirty_cafe_sales.csv', chunksize)
+    return pd.read_csv('dirty_cafe_sales.csv', usecols=list(RAW_DTYPES), dtype=RAW_DTYPES, engine='c', chunksize=chunksize)
 
-def perform_eda(df):
-    """Perform Exploratory Data Analysis"""
+def perform_eda(chunks):
+    """Perform Exploratory Data Analysis
+
+    The raw data is read one chunk at a time. Per-column counters are kept,
+    plus the set of distinct values of each column for the exact unique
+    counts, so memory grows with the number of distinct values (one per
+    Transaction ID) rather than with the raw file. Besides the missing-value
+    report and the number of calculation errors, returns the most common
+    value of each column in FILL_DEFAULTS so that every chunk is cleaned with
+    the same fill values.
+    """
     print("\n" + "="*50)
     print("EXPLORATORY DATA ANALYSIS")
     print("="*50)
     
-    print(f"\nDataset shape: {df.shape}")
-    print(f"Columns: {list(df.columns)}")
+    total_rows = 0
+    missing_counts = 0
+    placeholder_counts = 0
+    unique_values = {}
+    calc_errors = 0
+    value_counts = {col: Counter() for col in FILL_DEFAULTS}
+    for chunk in chunks:
+        if total_rows == 0:
+            columns, dtypes, head = chunk.columns, chunk.dtypes, chunk.head()
+        total_rows += len(chunk)
+        missing_counts = chunk.isnull().sum() + missing_counts
+        _, chunk_placeholder_counts = count_placeholders(chunk)
+        placeholder_counts = chunk_placeholder_counts + placeholder_counts
+        for col in chunk.columns:
+            unique_values.setdefault(col, set()).update(chunk[col].dropna().unique())
+        for col, counts in value_counts.items():
+            counts.update(chunk[col].value_counts().to_dict())
+        calc_errors += find_calc_errors(chunk).sum()
+    
+    print(f"\nDataset shape: {(total_rows, len(columns))}")
+    print(f"Columns: {list(columns)}")
     
     print("\nData types:")
-    print(df.dtypes)
+    print(dtypes)
     
     print("\nFirst 5 rows:")
-    print(df.head())
+    print(head)
     
     print("\nMissing/Invalid values (null/empty/ERROR/UNKNOWN):")
-    missing_counts = df.isnull().sum()
-    empty_counts = (df == '').sum()
-    error_counts = (df == 'ERROR').sum()
-    unknown_counts = (df == 'UNKNOWN').sum()
-    total_problematic = missing_counts + empty_counts + error_counts + unknown_counts
+    # Placeholder totals come from the small per-value table, not another scan of the mask
+    total_problematic = missing_counts + placeholder_counts.sum()
     
     missing_df = pd.DataFrame({
-        'Column': df.columns,
+        'Column': columns,
         'Null_Values': missing_counts,
-        'Empty_Values': empty_counts,
-        'ERROR_Values': error_counts,
-        'UNKNOWN_Values': unknown_counts,
+        'Empty_Values': placeholder_counts.loc[''],
+        'ERROR_Values': placeholder_counts.loc['ERROR'],
+        'UNKNOWN_Values': placeholder_counts.loc['UNKNOWN'],
         'Total_Problematic': total_problematic,
-        'Problematic_Percentage': (total_problematic / len(df)) * 100
+        'Problematic_Percentage': (total_problematic / total_rows) * 100
     })
     print(missing_df)
     
     print("\nUnique values per column:")
-    for col in df.columns:
-        unique_values = df[col].nunique()
-        print(f"{col}: {unique_values} unique values")
+    for col in columns:
+        print(f"{col}: {len(unique_values[col])} unique values")
         
-        # Show problematic values
-        unique_vals = df[col].unique()
-        problematic = [val for val in unique_vals if val in ['ERROR', 'UNKNOWN', '', np.nan]]
+        # Show problematic values, reusing the counts gathered above
+        problematic = [val for val in PROBLEMATIC_VALUES if placeholder_counts.at[val, col] > 0]
+        if missing_counts[col] > 0:
+            problematic.append(np.nan)
         if problematic:
             print(f"  - Problematic values found: {problematic}")
     
     # Check for calculation inconsistencies
     print("\nChecking calculation consistency (Quantity * Price Per Unit = Total Spent):")
-    df_calc = df.copy()
-    
-    # Convert numeric columns, handling errors
-    for col in ['Quantity', 'Price Per Unit', 'Total Spent']:
-        df_calc[col] = pd.to_numeric(df_calc[col], errors='coerce')
-    
-    # Calculate expected total
-    df_calc['Expected_Total'] = df_calc['Quantity'] * df_calc['Price Per Unit']
-    df_calc['Calc_Error'] = ~np.isclose(df_calc['Total Spent'], df_calc['Expected_Total'], rtol=1e-09, equal_nan=True)
-    
-    calc_errors = df_calc['Calc_Error'].sum()
     print(f"Rows with calculation errors: {calc_errors}")
     
-    return missing_df, calc_errors
+    most_common = {col: most_common_value(counts, FILL_DEFAULTS[col]) for col, counts in value_counts.items()}
+    return missing_df, calc_errors, most_common
 
-def clean_data(df):
-    """Main data cleaning function"""
+def fill_categorical(series, value):
+    """Fill missing entries of a categorical series, adding value as a category if needed"""
+    if value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.fillna(value)
+
+@dataclass
+class CleaningReport:
+    """What clean_data changed, for one chunk or summed over a whole file"""
+    initial_rows: int = 0
+    operations_performed: list = field(default_factory=list)
+    rows_removed_by_operation: dict = field(default_factory=dict)
+    values_imputed: dict = field(default_factory=dict)
+    imputation_values_used: dict = field(default_factory=dict)
+    price_corrections: int = 0
+    total_calculations_fixed: int = 0
+    final_rows: int = 0
+    total_rows_removed: int = 0
+    data_retention_rate: float = 0.0
+    # Position of each operation among the cleaning steps, used to keep merged
+    # reports in step order; not part of the saved report
+    operation_steps: dict = field(default_factory=dict)
+    
+    def add_operation(self, step, operation):
+        """Record an operation; step numbers operations in the order clean_data performs them"""
+        self.operations_performed.append(operation)
+        self.operation_steps[operation] = step
+    
+    def to_dict(self):
+        """Return the report as plain data for JSON"""
+        report = asdict(self)
+        del report['operation_steps']
+        return report
+
+def clean_data(df, fill_values=None, seen_ids=None):
+    """Main data cleaning function
+
+    fill_values maps Payment Method and Location to the value used for missing
+    entries. It lets chunks of a larger file share the mode of the whole file;
+    without it the mode of df is used.
+
+    seen_ids is a set of Transaction IDs kept from earlier chunks. Rows
+    repeating one of them are dropped as duplicates, and the IDs kept from df
+    are added to it, so it grows with the number of distinct IDs in the file.
+    """
     print("\n" + "="*50)
     print("DATA CLEANING")
     print("="*50)
     
-    df_clean = df.copy()
-    print(f"Starting with {len(df_clean)} rows")
-    
-    # Initialize cleaning report dictionary
-    cleaning_report = {
-        'initial_rows': len(df_clean),
-        'operations_performed': [],
-        'rows_removed_by_operation': {},
-        'values_imputed': {},
-        'imputation_values_used': {},
-        'price_corrections': 0,
-        'total_calculations_fixed': 0
-    }
+    print(f"Starting with {len(df)} rows")
+    
+    # Initialize cleaning report
+    cleaning_report = CleaningReport(initial_rows=len(df))
     
     # 1. Handle missing values and replace ERROR/UNKNOWN with NaN
     print("\n1. Handling missing and invalid values...")
     
     # Count problematic values before cleaning
-    error_counts = (df == 'ERROR').sum().sum()
-    unknown_counts = (df == 'UNKNOWN').sum().sum()
-    empty_counts = (df == '').sum().sum()
-    
-    # Replace empty strings and problematic values with NaN
-    df_clean = df_clean.replace(['', 'ERROR', 'UNKNOWN'], np.nan)
+    problematic_mask, placeholder_counts = count_placeholders(df)
+    error_counts = int(placeholder_counts.loc['ERROR'].sum())
+    unknown_counts = int(placeholder_counts.loc['UNKNOWN'].sum())
+    empty_counts = int(placeholder_counts.loc[''].sum())
+    
+    # Replace empty strings and problematic values with NaN. The working frame
+    # is built from these new columns, so df itself is never copied or modified;
+    # categorical columns only need the placeholder categories dropped
+    cleaned_columns = {}
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            categories = df[col].cat.categories
+            cleaned_columns[col] = df[col].cat.remove_categories([val for val in PROBLEMATIC_VALUES if val in categories])
+        else:
+            cleaned_columns[col] = df[col].mask(problematic_mask[col])
+    df_clean = pd.DataFrame(cleaned_columns)
     
-    cleaning_report['operations_performed'].append('Replaced ERROR/UNKNOWN/empty values with NaN')
-    cleaning_report['values_imputed']['ERROR_values_replaced'] = error_counts
-    cleaning_report['values_imputed']['UNKNOWN_values_replaced'] = unknown_counts
-    cleaning_report['values_imputed']['empty_values_replaced'] = empty_counts
+    cleaning_report.add_operation(1, 'Replaced ERROR/UNKNOWN/empty values with NaN')
+    cleaning_report.values_imputed['ERROR_values_replaced'] = error_counts
+    cleaning_report.values_imputed['UNKNOWN_values_replaced'] = unknown_counts
+    cleaning_report.values_imputed['empty_values_replaced'] = empty_counts
     
     print("Missing values after cleaning:")
     missing_after = df_clean.isnull().sum()
@@ -136,142 +304,160 @@ def clean_data(df):
     rows_removed = rows_before - rows_after
     print(f"Removed {rows_removed} rows with missing Transaction ID")
     
-    cleaning_report['operations_performed'].append('Removed rows with missing Transaction ID')
-    cleaning_report['rows_removed_by_operation']['missing_transaction_id'] = rows_removed
+    cleaning_report.add_operation(2, 'Removed rows with missing Transaction ID')
+    cleaning_report.rows_removed_by_operation['missing_transaction_id'] = rows_removed
+    
+    # Keep only the first occurrence of each Transaction ID
+    duplicate_ids = df_clean['Transaction ID'].duplicated()
+    if seen_ids is not None:
+        # Look each ID up in the set; isin would rebuild a hash table from all
+        # of seen_ids for every chunk, making the pass quadratic in the file size
+        ids = df_clean['Transaction ID']
+        duplicate_ids |= np.fromiter((txn_id in seen_ids for txn_id in ids), dtype=bool, count=len(ids))
+        seen_ids.update(df_clean.loc[~duplicate_ids, 'Transaction ID'])
+    duplicates_removed = int(duplicate_ids.sum())
+    if duplicates_removed > 0:
+        df_clean = df_clean[~duplicate_ids]
+        print(f"Removed {duplicates_removed} rows with duplicate Transaction ID")
+        
+        cleaning_report.add_operation(3, 'Removed rows with duplicate Transaction ID')
+        cleaning_report.rows_removed_by_operation['duplicate_transaction_id'] = duplicates_removed
     
     # 3. Clean Item column
     print("\n3. Cleaning Item column...")
-    missing_items = df_clean['Item'].isnull().sum()
-    print(f"Rows with missing items: {missing_items}")
+    mask_missing_item = df_clean['Item'].isnull()
+    missing_items = int(mask_missing_item.sum())
     
     # For missing items, try to infer from price
     # Meaning: If there's menu item, then the price should be in the menu prices
-    mask_missing_item = df_clean['Item'].isnull()
+    # Prices are converted once here and reused when cleaning them in step 4
+    # and, before any correction, when checking totals in step 5
+    raw_prices = pd.to_numeric(df_clean['Price Per Unit'], errors='coerce')
+    df_clean['Price Per Unit'] = raw_prices.astype('Float32')
     items_inferred = 0
-    if mask_missing_item.sum() > 0:
-        print("Attempting to infer missing items from price...")
-        for idx in df_clean[mask_missing_item].index:
-            price = pd.to_numeric(df_clean.loc[idx, 'Price Per Unit'], errors='coerce')
-            if not pd.isna(price):
-                # Find matching item from menu
-                for item, menu_price in MENU_PRICES.items():
-                    if price == menu_price:
-                        df_clean.loc[idx, 'Item'] = item
-                        print(f"  Inferred item '{item}' for row {idx} based on price ${price}")
-                        items_inferred += 1
-                        break
-                    
+    if missing_items > 0:
+        menu_items = [item for item in MENU_PRICES if item not in df_clean['Item'].cat.categories]
+        df_clean['Item'] = df_clean['Item'].cat.add_categories(menu_items)
+        inferred_items = df_clean.loc[mask_missing_item, 'Price Per Unit'].map(PRICE_TO_ITEM)
+        df_clean.loc[mask_missing_item, 'Item'] = inferred_items
+        items_inferred = int(inferred_items.notna().sum())
+    
     # Remove rows where item is still missing
     rows_before = len(df_clean)
     df_clean = df_clean.dropna(subset=['Item'])
     rows_after = len(df_clean)
     items_removed = rows_before - rows_after
-    if rows_before != rows_after:
-        print(f"Removed {items_removed} rows with unresolvable missing items")
+    print(f"Rows with missing items: {missing_items} ({items_inferred} inferred from price, {items_removed} unresolvable rows removed)")
     
-    cleaning_report['operations_performed'].append('Inferred missing items from prices and removed unresolvable items')
-    cleaning_report['values_imputed']['items_inferred_from_price'] = items_inferred
-    cleaning_report['rows_removed_by_operation']['unresolvable_missing_items'] = items_removed
+    cleaning_report.add_operation(4, 'Inferred missing items from prices and removed unresolvable items')
+    cleaning_report.values_imputed['items_inferred_from_price'] = items_inferred
+    cleaning_report.rows_removed_by_operation['unresolvable_missing_items'] = items_removed
     
     # 4. Clean numeric columns
     print("\n4. Cleaning numeric columns...")
     
     # Clean Quantity
-    df_clean['Quantity'] = pd.to_numeric(df_clean['Quantity'], errors='coerce')
-    invalid_qty = df_clean['Quantity'].isnull() | (df_clean['Quantity'] <= 0)
-    invalid_qty_count = invalid_qty.sum()
+    quantity = pd.to_numeric(df_clean['Quantity'], errors='coerce')
+    # Fixed on a copy; the raw quantities are still needed to check totals in step 5
+    fixed_quantity = quantity.to_numpy(dtype='float64', na_value=np.nan, copy=True)
+    # A valid quantity is a positive whole number that fits the Int16 column.
+    # NaN fails every comparison, so missing quantities are caught as well
+    invalid_qty = ~((fixed_quantity > 0)
+                    & (fixed_quantity <= np.iinfo(np.int16).max)
+                    & (fixed_quantity == np.floor(fixed_quantity)))
+    invalid_qty_count = int(invalid_qty.sum())
+    # Set invalid quantities to 1 (most common case)
+    imputation_value = 1
+    np.putmask(fixed_quantity, invalid_qty, imputation_value)
+    # Every remaining value passed the check above, so the Int16 cast is exact
+    df_clean['Quantity'] = pd.Series(fixed_quantity, index=df_clean.index).astype('Int16')
     if invalid_qty_count > 0:
-        print(f"Found {invalid_qty_count} invalid quantities")
-        # Set invalid quantities to 1 (most common case)
-        imputation_value = 1
-        df_clean.loc[invalid_qty, 'Quantity'] = imputation_value
-        print(f"Set invalid quantities to {imputation_value}")
+        print(f"Set {invalid_qty_count} invalid quantities to {imputation_value}")
         
-        cleaning_report['operations_performed'].append('Fixed invalid quantities by setting to 1')
-        cleaning_report['values_imputed']['invalid_quantities_fixed'] = invalid_qty_count
-        cleaning_report['imputation_values_used']['invalid_quantities'] = imputation_value
-    
-    # Clean Price Per Unit using menu prices
-    print("Cleaning Price Per Unit...")
-    df_clean['Price Per Unit'] = pd.to_numeric(df_clean['Price Per Unit'], errors='coerce')
-    
-    # Fill missing prices from menu
-    missing_price_mask = df_clean['Price Per Unit'].isnull()
-    prices_filled = 0
-    price_imputation_details = {}
-    for idx in df_clean[missing_price_mask].index:
-        item = df_clean.loc[idx, 'Item']
-        if item in MENU_PRICES:
-            menu_price = MENU_PRICES[item]
-            df_clean.loc[idx, 'Price Per Unit'] = menu_price
-            print(f"  Fixed price for {item} at row {idx}")
-            prices_filled += 1
-            # Track imputation values used
-            if item not in price_imputation_details:
-                price_imputation_details[item] = menu_price
-    
-    # Validate prices against menu
-    prices_corrected = 0
-    price_correction_details = {}
-    for idx, row in df_clean.iterrows():
-        item = row['Item']
-        price = row['Price Per Unit']
-        if item in MENU_PRICES and not pd.isna(price):
-            if price != MENU_PRICES[item]:
-                print(f"  Correcting price for {item} from ${price} to ${MENU_PRICES[item]} at row {idx}")
-                df_clean.loc[idx, 'Price Per Unit'] = MENU_PRICES[item]
-                prices_corrected += 1
-                # Track correction values used
-                if item not in price_correction_details:
-                    price_correction_details[item] = MENU_PRICES[item]
-    
-    cleaning_report['operations_performed'].append('Filled missing prices and corrected invalid prices using menu')
-    cleaning_report['values_imputed']['missing_prices_filled'] = prices_filled
-    cleaning_report['price_corrections'] = prices_corrected
-    cleaning_report['imputation_values_used']['missing_prices'] = price_imputation_details
-    cleaning_report['imputation_values_used']['corrected_prices'] = price_correction_details
-    
-    # 5. Recalculate Total Spent for all rows
-    print("\n5. Recalculating Total Spent for all rows...")
-    
-    # Since majority of prices and quantities have been corrected, recalculate all totals
-    df_clean['Total Spent'] = df_clean['Quantity'] * df_clean['Price Per Unit']
-    print(f"Recalculated Total Spent for all {len(df_clean)} rows")
-    
-    cleaning_report['operations_performed'].append('Recalculated Total Spent for all rows')
-    cleaning_report['total_calculations_fixed'] = len(df_clean)
+        cleaning_report.add_operation(5, 'Fixed invalid quantities by setting to 1')
+        cleaning_report.values_imputed['invalid_quantities_fixed'] = invalid_qty_count
+        cleaning_report.imputation_values_used['invalid_quantities'] = imputation_value
+    
+    # Clean Price Per Unit using menu prices: missing prices are filled and
+    # prices that disagree with the menu are corrected in the same write
+    prices = df_clean['Price Per Unit']
+    expected_prices = lookup_menu_prices(df_clean['Item'])
+    missing_price_mask = prices.isnull() & expected_prices.notna()
+    price_mismatch = (prices.notna() & expected_prices.notna() & (prices != expected_prices)).fillna(False)
+    df_clean['Price Per Unit'] = prices.mask(missing_price_mask | price_mismatch, expected_prices)
+    prices_filled = int(missing_price_mask.sum())
+    prices_corrected = int(price_mismatch.sum())
+    price_imputation_details = {item: MENU_PRICES[item] for item in df_clean.loc[missing_price_mask, 'Item'].unique()}
+    price_correction_details = {item: MENU_PRICES[item] for item in df_clean.loc[price_mismatch, 'Item'].unique()}
+    print(f"Price Per Unit: {prices_filled} missing prices filled and {prices_corrected} prices corrected from the menu")
+    if VERBOSE:
+        print(f"  Filled per item: {df_clean.loc[missing_price_mask, 'Item'].value_counts().loc[lambda c: c > 0].to_dict()}")
+        print(f"  Corrected per item: {df_clean.loc[price_mismatch, 'Item'].value_counts().loc[lambda c: c > 0].to_dict()}")
+    
+    cleaning_report.add_operation(6, 'Filled missing prices and corrected invalid prices using menu')
+    cleaning_report.values_imputed['missing_prices_filled'] = prices_filled
+    cleaning_report.price_corrections = prices_corrected
+    cleaning_report.imputation_values_used['missing_prices'] = price_imputation_details
+    cleaning_report.imputation_values_used['corrected_prices'] = price_correction_details
+    
+    # 5. Recalculate Total Spent
+    print("\n5. Recalculating Total Spent...")
+    
+    # Totals are only stale where an input was fixed above or where they
+    # disagree with the raw inputs; rows that were already correct are left as is
+    # The check reuses the numbers converted in steps 3-4 instead of parsing them again
+    total_spent = pd.to_numeric(df_clean['Total Spent'], errors='coerce')
+    calc_errors = calc_error_mask(quantity, raw_prices.loc[df_clean.index], total_spent)
+    recalc_mask = invalid_qty | missing_price_mask | price_mismatch | calc_errors
+    df_clean['Total Spent'] = total_spent.astype('Float32')
+    df_clean.loc[recalc_mask, 'Total Spent'] = (df_clean.loc[recalc_mask, 'Quantity']
+                                                * df_clean.loc[recalc_mask, 'Price Per Unit'])
+    total_recalculated = int(recalc_mask.sum())
+    print(f"Recalculated Total Spent for {total_recalculated} of {len(df_clean)} rows")
+    
+    cleaning_report.add_operation(7, 'Recalculated Total Spent where quantity/price changed or totals were inconsistent')
+    cleaning_report.total_calculations_fixed = total_recalculated
+    
+    # Missing counts for steps 6-8 in one pass; no rows are dropped in between
+    missing_counts = df_clean.isnull().sum()
+    
+    # Without shared fill values, use the modes of this frame, counted only
+    # for the columns that actually need filling
+    if fill_values is None:
+        fill_values = {col: most_common_value(df_clean[col].value_counts(), default)
+                       for col, default in FILL_DEFAULTS.items() if missing_counts[col] > 0}
     
     # 6. Clean Payment Method
     print("\n6. Cleaning Payment Method...")
-    missing_payment = df_clean['Payment Method'].isnull().sum()
+    missing_payment = int(missing_counts['Payment Method'])
     if missing_payment > 0:
         print(f"Found {missing_payment} missing payment methods")
         # Fill with most common payment method
-        most_common_payment = df_clean['Payment Method'].mode()[0] if len(df_clean['Payment Method'].mode()) > 0 else 'Cash'
-        df_clean['Payment Method'] = df_clean['Payment Method'].fillna(most_common_payment)
+        most_common_payment = fill_values['Payment Method']
+        df_clean['Payment Method'] = fill_categorical(df_clean['Payment Method'], most_common_payment)
         print(f"Filled missing payment methods with '{most_common_payment}'")
         
-        cleaning_report['operations_performed'].append(f'Filled missing payment methods with mode ({most_common_payment})')
-        cleaning_report['values_imputed']['payment_methods_filled'] = missing_payment
-        cleaning_report['imputation_values_used']['payment_method'] = most_common_payment
+        cleaning_report.add_operation(8, f'Filled missing payment methods with mode ({most_common_payment})')
+        cleaning_report.values_imputed['payment_methods_filled'] = missing_payment
+        cleaning_report.imputation_values_used['payment_method'] = most_common_payment
     
     # 7. Clean Location
     print("\n7. Cleaning Location...")
-    missing_location = df_clean['Location'].isnull().sum()
+    missing_location = int(missing_counts['Location'])
     if missing_location > 0:
         print(f"Found {missing_location} missing locations")
         # Fill with most common location
-        most_common_location = df_clean['Location'].mode()[0] if len(df_clean['Location'].mode()) > 0 else 'In-store'
-        df_clean['Location'] = df_clean['Location'].fillna(most_common_location)
+        most_common_location = fill_values['Location']
+        df_clean['Location'] = fill_categorical(df_clean['Location'], most_common_location)
         print(f"Filled missing locations with '{most_common_location}'")
         
-        cleaning_report['operations_performed'].append(f'Filled missing locations with mode ({most_common_location})')
-        cleaning_report['values_imputed']['locations_filled'] = missing_location
-        cleaning_report['imputation_values_used']['location'] = most_common_location
+        cleaning_report.add_operation(9, f'Filled missing locations with mode ({most_common_location})')
+        cleaning_report.values_imputed['locations_filled'] = missing_location
+        cleaning_report.imputation_values_used['location'] = most_common_location
     
     # 8. Clean Transaction Date
     print("\n8. Cleaning Transaction Date...")
-    missing_dates = df_clean['Transaction Date'].isnull().sum()
+    missing_dates = int(missing_counts['Transaction Date'])
     if missing_dates > 0:
         print(f"Found {missing_dates} missing dates")
         # Remove rows with missing dates as they're critical
@@ -281,28 +467,69 @@ def clean_data(df):
         dates_removed = rows_before - rows_after
         print(f"Removed {dates_removed} rows with missing dates")
         
-        cleaning_report['operations_performed'].append('Removed rows with missing transaction dates')
-        cleaning_report['rows_removed_by_operation']['missing_transaction_dates'] = dates_removed
-    
-    # Validate date format
-    try:
-        df_clean['Transaction Date'] = pd.to_datetime(df_clean['Transaction Date'])
+        cleaning_report.add_operation(10, 'Removed rows with missing transaction dates')
+        cleaning_report.rows_removed_by_operation['missing_transaction_dates'] = dates_removed
+    
+    # Validate date format; dates in the source are ISO formatted, so give the
+    # format explicitly instead of letting pandas infer it per value
+    # Many rows share a day, so parse each distinct date string only once
+    date_codes, unique_dates = pd.factorize(df_clean['Transaction Date'])
+    parsed_dates = pd.to_datetime(unique_dates, format='%Y-%m-%d', errors='coerce')
+    df_clean['Transaction Date'] = parsed_dates.take(date_codes, fill_value=pd.NaT)
+    # Missing dates were dropped above, so any NaT left failed to parse
+    invalid_dates = int(df_clean['Transaction Date'].isnull().sum())
+    if invalid_dates > 0:
+        # A transaction without a usable date is as unusable as a missing one
+        df_clean = df_clean.dropna(subset=['Transaction Date'])
+        print(f"Removed {invalid_dates} rows with dates not in YYYY-MM-DD format")
+        cleaning_report.rows_removed_by_operation['unparseable_transaction_dates'] = invalid_dates
+    else:
         print("Successfully converted dates to datetime format")
-        cleaning_report['operations_performed'].append('Successfully converted dates to datetime format')
-    except:
-        print("Some dates may have formatting issues - will keep as text for manual review")
-        cleaning_report['operations_performed'].append('Date conversion failed - kept as text for manual review')
+    # One operation either way, so merged chunk reports never contradict each
+    # other; the removed rows are counted in rows_removed_by_operation
+    cleaning_report.add_operation(11, 'Converted dates to datetime format, removing unparseable dates')
     
     # Finalize cleaning report
-    cleaning_report['final_rows'] = len(df_clean)
-    cleaning_report['total_rows_removed'] = cleaning_report['initial_rows'] - len(df_clean)
-    cleaning_report['data_retention_rate'] = (len(df_clean) / cleaning_report['initial_rows']) * 100
+    cleaning_report.final_rows = len(df_clean)
+    cleaning_report.total_rows_removed = cleaning_report.initial_rows - len(df_clean)
+    cleaning_report.data_retention_rate = (len(df_clean) / cleaning_report.initial_rows) * 100
     
     print(f"\nCleaning complete! Final dataset: {len(df_clean)} rows")
     return df_clean, cleaning_report
 
+def merge_cleaning_reports(total, report):
+    """Fold the CleaningReport of one chunk into the running total"""
+    if total is None:
+        return report
+    
+    total.initial_rows += report.initial_rows
+    total.final_rows += report.final_rows
+    total.price_corrections += report.price_corrections
+    total.total_calculations_fixed += report.total_calculations_fixed
+    for operation in report.operations_performed:
+        if operation not in total.operation_steps:
+            total.add_operation(report.operation_steps[operation], operation)
+    # Chunks may perform different operations, so restore step order; the sort
+    # is stable, so variants of one step keep the order they were first seen in
+    total.operations_performed.sort(key=total.operation_steps.get)
+    for section, counts in [(total.rows_removed_by_operation, report.rows_removed_by_operation),
+                            (total.values_imputed, report.values_imputed)]:
+        for key, count in counts.items():
+            section[key] = section.get(key, 0) + count
+    for key, value in report.imputation_values_used.items():
+        if isinstance(value, dict):
+            details = total.imputation_values_used.setdefault(key, {})
+            for item, item_value in value.items():
+                details.setdefault(item, item_value)
+        else:
+            total.imputation_values_used.setdefault(key, value)
+    
+    total.total_rows_removed = total.initial_rows - total.final_rows
+    total.data_retention_rate = (total.final_rows / total.initial_rows) * 100
+    return total
+
 def generate_cleaning_report(cleaning_report):
-    """Generate a detailed data cleaning report"""
+    """Generate a detailed data cleaning report from a CleaningReport"""
     print("\n" + "="*60)
     print("DETAILED DATA CLEANING REPORT")
     print("="*60)
@@ -310,156 +537,169 @@ def generate_cleaning_report(cleaning_report):
     # Overview
     print(f"\n[OVERVIEW] CLEANING SUMMARY")
     print("-" * 30)
-    print(f"Initial rows: {cleaning_report['initial_rows']:,}")
-    print(f"Final rows: {cleaning_report['final_rows']:,}")
-    print(f"Total rows removed: {cleaning_report['total_rows_removed']:,}")
-    print(f"Data retention rate: {cleaning_report['data_retention_rate']:.2f}%")
+    print(f"Initial rows: {cleaning_report.initial_rows:,}")
+    print(f"Final rows: {cleaning_report.final_rows:,}")
+    print(f"Total rows removed: {cleaning_report.total_rows_removed:,}")
+    print(f"Data retention rate: {cleaning_report.data_retention_rate:.2f}%")
     
     # Operations performed
     print(f"\n[OPERATIONS] CLEANING STEPS PERFORMED")
     print("-" * 40)
-    for i, operation in enumerate(cleaning_report['operations_performed'], 1):
+    for i, operation in enumerate(cleaning_report.operations_performed, 1):
         print(f"{i:2d}. {operation}")
     
     # Rows removed by operation
-    if cleaning_report['rows_removed_by_operation']:
+    if cleaning_report.rows_removed_by_operation:
         print(f"\n[REMOVED] ROWS REMOVED BY OPERATION")
         print("-" * 35)
         total_removed = 0
-        for operation, count in cleaning_report['rows_removed_by_operation'].items():
+        for operation, count in cleaning_report.rows_removed_by_operation.items():
             if count > 0:
                 print(f"• {operation.replace('_', ' ').title()}: {count:,} rows")
                 total_removed += count
         print(f"Total removed: {total_removed:,} rows")
     
     # Values imputed/fixed
-    if cleaning_report['values_imputed']:
+    if cleaning_report.values_imputed:
         print(f"\n[FIXED] VALUES IMPUTED/FIXED")
         print("-" * 25)
-        for operation, count in cleaning_report['values_imputed'].items():
+        for operation, count in cleaning_report.values_imputed.items():
             if count > 0:
                 print(f"• {operation.replace('_', ' ').title()}: {count:,} values")
     
     # Price corrections
-    if cleaning_report['price_corrections'] > 0:
+    if cleaning_report.price_corrections > 0:
         print(f"\n[PRICES] PRICE CORRECTIONS")
         print("-" * 20)
-        print(f"• Incorrect prices corrected: {cleaning_report['price_corrections']:,}")
+        print(f"• Incorrect prices corrected: {cleaning_report.price_corrections:,}")
     
     # Total calculations
-    if cleaning_report['total_calculations_fixed'] > 0:
+    if cleaning_report.total_calculations_fixed > 0:
         print(f"\n[CALCULATIONS] TOTAL SPENT UPDATES")
         print("-" * 22)
-        print(f"• Total Spent recalculated for: {cleaning_report['total_calculations_fixed']:,} rows")
+        print(f"• Total Spent recalculated for: {cleaning_report.total_calculations_fixed:,} rows")
     
     # Imputation values used
-    if cleaning_report['imputation_values_used']:
+    if cleaning_report.imputation_values_used:
         print(f"\n[IMPUTATION] VALUES USED FOR IMPUTATION")
         print("-" * 35)
-        for field, value in cleaning_report['imputation_values_used'].items():
+        for key, value in cleaning_report.imputation_values_used.items():
             if isinstance(value, dict):
-                print(f"• {field.replace('_', ' ').title()}:")
+                print(f"• {key.replace('_', ' ').title()}:")
                 for item, item_value in value.items():
                     print(f"  - {item}: ${item_value}")
             else:
-                print(f"• {field.replace('_', ' ').title()}: {value}")
+                print(f"• {key.replace('_', ' ').title()}: {value}")
     
     print(f"\n[SUCCESS] CLEANING COMPLETED")
     print("-" * 18)
     print("* All data cleaning operations completed successfully!")
     print("* Dataset is now ready for analysis and migration")
 
-def generate_summary_report(df_original, df_clean):
-    """Generate a summary report of the cleaning process"""
+def generate_summary_report(cleaning_report, final_missing, final_unique):
+    """Generate a summary report of the cleaning process
+
+    final_missing holds the missing-value count per column of the cleaned data
+    and final_unique the set of values found in each categorical column.
+    """
     print("\n" + "="*50)
     print("CLEANING SUMMARY REPORT")
     print("="*50)
     
-    print(f"Original rows: {len(df_original)}")
-    print(f"Cleaned rows: {len(df_clean)}")
-    print(f"Rows removed: {len(df_original) - len(df_clean)}")
-    print(f"Data retention rate: {len(df_clean)/len(df_original)*100:.2f}%")
+    original_rows = cleaning_report.initial_rows
+    cleaned_rows = cleaning_report.final_rows
+    print(f"Original rows: {original_rows}")
+    print(f"Cleaned rows: {cleaned_rows}")
+    print(f"Rows removed: {original_rows - cleaned_rows}")
+    print(f"Data retention rate: {cleaned_rows/original_rows*100:.2f}%")
     
     print(f"\nFinal data quality:")
     print("Missing values:")
-    final_missing = df_clean.isnull().sum()
     for col, count in final_missing.items():
-        print(f"  {col}: {count} missing values ({count/len(df_clean)*100:.1f}%)")
+        print(f"  {col}: {count} missing values ({count/cleaned_rows*100:.1f}%)")
     
     if final_missing.sum() == 0:
         print("[SUCCESS] No missing values in final dataset!")
     
     # Show unique values for categorical columns
     print("\nFinal unique values:")
-    categorical_cols = ['Item', 'Payment Method', 'Location']
-    for col in categorical_cols:
-        if col in df_clean.columns:
-            unique_vals = sorted(df_clean[col].unique())
-            print(f"  {col}: {unique_vals}")
+    for col, unique_vals in final_unique.items():
+        print(f"  {col}: {sorted(unique_vals)}")
 
 def main():
     """Main execution function"""
-    # Load data
-    df = load_data()
-    
-    # Perform EDA
-    missing_report, calc_errors = perform_eda(df)
+    # Perform EDA (first pass over the data)
+    missing_report, calc_errors, most_common = perform_eda(load_data())
     
-    # Clean data
-    df_clean, cleaning_report = clean_data(df)
+    # Clean data (second pass), appending each cleaned chunk to the output file
+    clean_filename = 'cleaned_cafe_sales.csv'
+    cleaning_report = None
+    final_missing = 0
+    final_unique = {col: set() for col in CATEGORICAL_COLUMNS}
+    sample = None
+    # Every kept Transaction ID, to catch duplicates across chunks; unlike the
+    # chunks themselves this grows with the number of distinct IDs
+    seen_ids = set()
+    # Always written by pandas, so the file's bytes do not depend on whether
+    # pyarrow is installed
+    with open(clean_filename, 'wb') as f:
+        for chunk in load_data():
+            chunk_clean, chunk_report = clean_data(chunk, most_common, seen_ids)
+            chunk_clean.to_csv(f, index=False, header=cleaning_report is None)
+            cleaning_report = merge_cleaning_reports(cleaning_report, chunk_report)
+            final_missing = chunk_clean.isnull().sum() + final_missing
+            for col, unique_vals in final_unique.items():
+                unique_vals.update(chunk_clean[col].unique())
+            if sample is None:
+                sample = chunk_clean.head()
     
     # Generate detailed cleaning report
     generate_cleaning_report(cleaning_report)
     
     # Generate summary
-    generate_summary_report(df, df_clean)
+    generate_summary_report(cleaning_report, final_missing, final_unique)
     
     # Save cleaned data
     print("\n" + "="*50)
     print("SAVING CLEANED DATA")
     print("="*50)
     
-    # Save main cleaned dataset
-    clean_filename = 'cleaned_cafe_sales.csv'
-    df_clean.to_csv(clean_filename, index=False)
+    # Main cleaned dataset was written chunk by chunk above
     print(f"[SAVED] Cleaned data saved to: {clean_filename}")
     
-    # Save EDA report
-    eda_filename = 'eda_report_corrected.csv'
-    missing_report.to_csv(eda_filename, index=False)
+    # Save EDA report as JSON, alongside the cleaning report
+    eda_filename = 'eda_report.json'
+    missing_report.to_json(eda_filename, orient='records', indent=2)
     print(f"[SAVED] Corrected EDA report saved to: {eda_filename}")
     
     # Save cleaning report as JSON
     import json
     
-    # Convert numpy types to native Python types for JSON serialization
-    def convert_numpy_types(obj):
-        """Convert numpy types to native Python types for JSON serialization"""
-        if isinstance(obj, dict):
-            return {key: convert_numpy_types(value) for key, value in obj.items()}
-        elif isinstance(obj, list):
-            return [convert_numpy_types(item) for item in obj]
-        elif isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        else:
-            return obj
-    
-    cleaned_report = convert_numpy_types(cleaning_report)
+    # clean_data stores counts as Python ints, so the report is JSON-native as is
     cleaning_report_filename = 'data_cleaning_report.json'
     with open(cleaning_report_filename, 'w') as f:
-        json.dump(cleaned_report, f, indent=2)
+        json.dump(cleaning_report.to_dict(), f, indent=2)
     print(f"[SAVED] Detailed cleaning report saved to: {cleaning_report_filename}")
     
     # Show sample of cleaned data
     print(f"\nSample of cleaned data (first 5 rows):")
-    print(df_clean.head())
+    print(sample)
     
     print(f"\n[COMPLETE] Data cleaning completed successfully!")
-    print(f"Final dataset contains {len(df_clean)} clean records")
+    print(f"Final dataset contains {cleaning_report.final_rows} clean records")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import os
+    
+    # Set PROFILE=1 to print the 30 most expensive calls after the run
+    if os.environ.get('PROFILE'):
+        import cProfile
+        import pstats
+        
+        profiler = cProfile.Profile()
+        profiler.enable()
+        main()
+        profiler.disable()
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(30)
+    else:
+        main()
\ No newline at end of file